@@ -1,10 +1,13 @@
-import json
 import random
 from asyncio import sleep as asleep
+from pathlib import Path
 from time import sleep
 
-with open('chunk.json', encoding='utf-8') as fin:
-    TEST_AVIA_SEARCH = json.load(fin)
+import orjson
+
+CHUNK_PATH = Path(__file__).resolve().parent.parent / 'chunk.json'
+
+TEST_AVIA_SEARCH = orjson.loads(CHUNK_PATH.read_bytes())
 
 
 class AviaApi:
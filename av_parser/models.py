@@ -1,29 +1,33 @@
 from typing import List, Dict, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
-class BaggageInfo(BaseModel):
+class FrozenModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+
+class BaggageInfo(FrozenModel):
     count: int
     weight: Optional[int] = None
 
 
-class Baggage(BaseModel):
+class Baggage(FrozenModel):
     handbags: BaggageInfo
     baggage: BaggageInfo
 
 
-class RuleInfo(BaseModel):
+class RuleInfo(FrozenModel):
     available: bool
     is_from_config: bool
 
 
-class Rules(BaseModel):
+class Rules(FrozenModel):
     return_before_flight: RuleInfo
     change_before_flight: RuleInfo
 
 
-class FlightSegment(BaseModel):
+class FlightSegment(FrozenModel):
     departure: str
     arrival: str
     departure_date: str
@@ -34,24 +38,24 @@ class FlightSegment(BaseModel):
     operating_carrier: str
 
 
-class FlightInfo(BaseModel):
+class FlightInfo(FrozenModel):
     forward: List[FlightSegment]
 
 
-class FareInfo(BaseModel):
+class FareInfo(FrozenModel):
     fare_code: str
     trip_class: str
     baggage: Baggage
     rules: Rules
 
 
-class Fare(BaseModel):
+class Fare(FrozenModel):
     fare_key: str
     fare_info: List[FareInfo]
     prices: dict[str, int]
 
 
-class FlightOffer(BaseModel):
+class FlightOffer(FrozenModel):
     is_vtrip: bool
     key: str
     flight_info: FlightInfo
@@ -62,7 +66,7 @@ class FlightOffer(BaseModel):
     min_provider: str
 
 
-class ServiceResponse(BaseModel):
+class ServiceResponse(FrozenModel):
     success: bool
     pid: str
     result: Dict[str, List[FlightOffer]]
@@ -140,4 +144,4 @@ if __name__ == "__main__":
         }
     }
 
-    print(ServiceResponse(**sample_data))
+    print(ServiceResponse.model_validate(sample_data))
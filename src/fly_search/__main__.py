@@ -13,6 +13,11 @@ def main() -> None:
         host=settings.host,
         port=settings.port,
         reload=settings.reload,
+        # uvicorn не поддерживает несколько воркеров вместе с reload. По умолчанию один
+        # процесс: кеш ответов и задач в памяти у каждого процесса свой
+        workers=1 if settings.reload else settings.dev_server_workers,
+        loop=settings.loop,
+        http=settings.http,
         factory=False,
     )
 
@@ -14,15 +14,22 @@ from fly_search.infrastructure.avia_api_adapter import AviaApiAdapter
 from fly_search.infrastructure.background_task_manager import BackgroundTaskManager
 from fly_search.infrastructure.cache_service import CacheService
 
+# Providers below are `async def` on purpose: FastAPI runs sync dependencies in the
+# threadpool, while none of them does blocking work.
 
-@lru_cache(maxsize=1)
-def get_converter() -> FlightOfferConverter:
-    return FlightOfferConverter()
+_converter = FlightOfferConverter()
+# Настройки адаптера читаются один раз при создании, а не на каждый запрос
+_avia_api = AviaApiAdapter()
+
+
+async def get_converter() -> FlightOfferConverter:
+    """Return converter instance (singleton)."""
+    return _converter
 
 
-def get_avia_api() -> AviaApiProtocol:
-    """Return adapter wrapping AviaApi to conform to protocol."""
-    return AviaApiAdapter()
+async def get_avia_api() -> AviaApiProtocol:
+    """Return adapter wrapping AviaApi to conform to protocol (singleton)."""
+    return _avia_api
 
 
 @lru_cache(maxsize=1)
@@ -31,7 +38,12 @@ def get_cache_service() -> CacheService:
     return CacheService()
 
 
-def get_flight_service(
+async def provide_cache_service() -> CacheService:
+    """Expose the cache singleton to FastAPI without a threadpool hop."""
+    return get_cache_service()
+
+
+async def get_flight_service(
     avia_api: AviaApiProtocol = Depends(get_avia_api),
     converter: FlightOfferConverter = Depends(get_converter),
 ) -> FlightSearchService:
@@ -39,16 +51,13 @@ def get_flight_service(
     return FlightSearchService(avia_api=avia_api, converter=converter)
 
 
-def get_background_task_service(
-    flight_service: FlightSearchService = Depends(get_flight_service),
-) -> BackgroundTaskService:
-    """Assemble background task service."""
-    return BackgroundTaskService(flight_search_service=flight_service)
-
+def build_background_task_manager() -> BackgroundTaskManager:
+    """
+    Assemble background task manager once, at application startup.
 
-def get_background_task_manager(
-    task_service: BackgroundTaskService = Depends(get_background_task_service),
-    cache_service: CacheService = Depends(get_cache_service),
-) -> BackgroundTaskManager:
-    """Assemble background task manager."""
-    return BackgroundTaskManager(task_service=task_service, cache_service=cache_service)
+    The whole graph is stateless between requests, so task routes read the
+    instance from app.state instead of re-resolving it through Depends.
+    """
+    flight_service = FlightSearchService(avia_api=_avia_api, converter=_converter)
+    task_service = BackgroundTaskService(flight_search_service=flight_service)
+    return BackgroundTaskManager(task_service=task_service, cache_service=get_cache_service())
@@ -4,14 +4,11 @@ from __future__ import annotations
 
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 
 from av_parser.models import ServiceResponse
-from fly_search.api.dependencies import (
-    get_background_task_manager,
-    get_cache_service,
-    get_flight_service,
-)
+from fly_search.api.dependencies import get_flight_service, provide_cache_service
 from fly_search.domain.services.background_task import TaskStatus
 from fly_search.domain.services.flight_search import FlightSearchService
 from fly_search.infrastructure.background_task_manager import (
@@ -26,69 +23,77 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# pid читается напрямую из request.query_params (без валидатора Query на каждый запрос),
+# поэтому для OpenAPI параметр описываем вручную
+_PID_QUERY_PARAMETER = {
+    "name": "pid",
+    "in": "query",
+    "required": False,
+    "description": "External process identifier",
+    "schema": {"type": "string"},
+}
+
 
 @router.get(
     "/get_flights",
-    response_model=ServiceResponse,
-    response_model_exclude_none=True,
+    responses={200: {"model": ServiceResponse}},
+    openapi_extra={"parameters": [_PID_QUERY_PARAMETER]},
     tags=["flights"],
 )
 async def get_flights(
-    pid: str | None = Query(
-        default=None,
-        description="External process identifier"),
+    request: Request,
     service: FlightSearchService = Depends(get_flight_service),
-    cache: CacheService = Depends(get_cache_service),
-) -> ServiceResponse:
+    cache: CacheService = Depends(provide_cache_service),
+) -> Response:
     """
     Return normalized search results from provider.
 
     Results are cached for 3 minutes based on pid parameter.
+    The cache holds the serialized JSON body, so a hit is returned as is
+    without re-validating or re-encoding the ServiceResponse.
     """
+    pid = request.query_params.get("pid")
     # Строим ключ кеша с учётом pid
     cache_key = CacheService.build_cache_key("flights", pid=pid)
 
-    # Пытаемся получить из кеша
-    cached_response = cache.get_response(cache_key)
-    if cached_response is not None:
-        logger.info(
-            "get_flights cache hit",
-            extra={"event": "cache_hit", "pid": pid, "cache_key": cache_key},
-        )
-        return cached_response
-
-    # Кеш промах - выполняем запрос
-    logger.info("get_flights called", extra={"event": "call", "pid": pid})
-    response = await service.get_offers(pid=pid)
-
-    # Сохраняем в кеш
-    cache.set_response(cache_key, response)
-
-    logger.info(
-        "get_flights finished",
-        extra={
-            "pid": response.pid,
-            "success": response.success,
-            "offers_count": sum(len(v) for v in response.result.values()),
-            "cached": True,
-        },
-    )
-    return response
-
-
-@router.post("/start_search", tags=["tasks"])
-async def start_search(
-    pid: str | None = Query(
-        default=None,
-        description="External process identifier",
-    ),
-    task_manager: BackgroundTaskManager = Depends(get_background_task_manager),
-) -> dict[str, str]:
+    async def _search() -> bytes:
+        # Кеш промах - выполняем запрос
+        logger.info("get_flights called", extra={"event": "call", "pid": pid})
+        response = await service.get_offers(pid=pid)
+
+        # offers_count - лишний проход по результату, считаем только если INFO включён
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "get_flights finished",
+                extra={
+                    "pid": response.pid,
+                    "success": response.success,
+                    "offers_count": sum(len(v) for v in response.result.values()),
+                    "cached": True,
+                },
+            )
+        # Сериализуем один раз - в кеш попадает готовое тело ответа
+        return response.model_dump_json(exclude_none=True).encode()
+
+    # Берём тело из кеша (попадание логирует сам кеш), иначе ищем; конкурентные
+    # запросы с тем же pid дожидаются одного поиска
+    payload = await cache.get_or_set_response(cache_key, _search)
+    return Response(content=payload, media_type="application/json")
+
+
+@router.post(
+    "/start_search",
+    openapi_extra={"parameters": [_PID_QUERY_PARAMETER]},
+    tags=["tasks"],
+)
+async def start_search(request: Request) -> dict[str, str]:
     """
     Start background search task.
 
     Returns task_id that can be used to retrieve results via /get_result.
     """
+    pid = request.query_params.get("pid")
+    task_manager: BackgroundTaskManager = request.app.state.task_manager
     logger.info(
         "start_search called", extra={"event": "start_task", "pid": pid}
     )
@@ -100,24 +105,30 @@ async def start_search(
     return {"task_id": task_id, "status": TaskStatus.PROCESSING}
 
 
-@router.get("/get_result", tags=["tasks"])
+@router.get(
+    "/get_result",
+    response_model=None,
+    responses={200: {"model": ServiceResponse}},
+    tags=["tasks"],
+)
 async def get_result(
+    request: Request,
     task_id: str = Query(
         description="Task identifier returned by /start_search"
     ),
-    task_manager: BackgroundTaskManager = Depends(get_background_task_manager),
-) -> dict | ServiceResponse:
+) -> Response:
     """
     Get result of background search task.
 
     Returns task status and result (if completed) or error (if failed).
     """
+    task_manager: BackgroundTaskManager = request.app.state.task_manager
     logger.info(
         "get_result called", extra={"event": "get_result", "task_id": task_id}
     )
 
     try:
-        return task_manager.get_task_response(task_id)
+        task_response = task_manager.get_task_response(task_id)
     except TaskNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e)) from None
     except TaskResultMissingError as e:
@@ -125,3 +136,8 @@ async def get_result(
     except TaskFailedError as e:
         raise HTTPException(status_code=500, detail=str(e)) from None
 
+    # Сериализуем напрямую, без повторной валидации через response_model
+    if isinstance(task_response, ServiceResponse):
+        return Response(content=task_response.model_dump_json(), media_type="application/json")
+    return ORJSONResponse(content=task_response)
+
@@ -2,16 +2,39 @@
 
 from __future__ import annotations
 
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from fly_search.api import router
+from fly_search.api.dependencies import build_background_task_manager
 from fly_search.logging_config import configure_logging
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Application startup/shutdown hooks."""
+    # Пул anyio (sync-зависимости и эндпоинты) по умолчанию 40 потоков - ограничиваем
+    # его числом CPU, чтобы всплеск синхронной работы не упирался в GIL
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = min(32, (os.cpu_count() or 1) * 2)
+    yield
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application instance."""
     configure_logging()
-    app = FastAPI(title="Fly Search API", version="0.1.0")
+    app = FastAPI(
+        title="Fly Search API",
+        version="0.1.0",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+    app.state.task_manager = build_background_task_manager()
     app.include_router(router)
 
     @app.get("/health", tags=["health"])
@@ -29,6 +29,22 @@ class Settings(BaseSettings):
         gt=0,
         le=32,
     )
+    dev_server_workers: int = Field(
+        default=1,
+        description="Number of uvicorn worker processes for dev-server without reload",
+        gt=0,
+        le=32,
+    )
+    loop: str = Field(
+        default="uvloop",
+        description="Uvicorn event loop implementation",
+        pattern="^(auto|asyncio|uvloop)$",
+    )
+    http: str = Field(
+        default="httptools",
+        description="Uvicorn HTTP protocol implementation",
+        pattern="^(auto|h11|httptools)$",
+    )
 
     # AviaApiAdapter settings
     max_concurrent_threads: int = Field(
@@ -37,18 +53,18 @@ class Settings(BaseSettings):
         gt=0,
         le=100,
     )
-    chunk_queue_timeout: float = Field(
-        default=0.1,
-        description="Timeout for chunk queue get operation (seconds)",
-        gt=0,
-        le=10,
-    )
     thread_join_timeout: float = Field(
         default=1.0,
         description="Timeout for thread join operation (seconds)",
         gt=0,
         le=60,
     )
+    chunk_queue_size: int = Field(
+        default=16,
+        description="Maximum number of chunks buffered between generator thread and consumer",
+        gt=0,
+        le=1000,
+    )
 
     # Logging settings
     log_level: str = Field(
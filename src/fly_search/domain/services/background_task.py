@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import logging
-from uuid import uuid4
+import os
+import time
+from uuid import UUID
 
 from av_parser.models import ServiceResponse
 
@@ -11,6 +13,10 @@ from .flight_search import FlightSearchService
 
 logger = logging.getLogger(__name__)
 
+# Один вызов os.urandom на ~400 идентификаторов задач
+_ENTROPY_POOL_SIZE = 4096
+_TASK_ID_RANDOM_BYTES = 10
+
 
 class TaskStatus:
     """Task status constants."""
@@ -38,6 +44,8 @@ class BackgroundTaskService:
             flight_search_service: Service for executing flight searches
         """
         self._flight_search_service = flight_search_service
+        self._entropy_pool = b""
+        self._pool_idx = 0
 
     async def start_task(self, pid: str | None = None) -> str:
         """
@@ -49,7 +57,7 @@ class BackgroundTaskService:
         Returns:
             Task ID for tracking the task
         """
-        task_id = str(uuid4())
+        task_id = self._generate_task_id()
 
         logger.info(
             "Background task started",
@@ -88,3 +96,22 @@ class BackgroundTaskService:
             )
             raise
 
+    def _generate_task_id(self) -> str:
+        """
+        Generate time-ordered UUIDv7 task identifier (RFC 9562).
+
+        48 bits of Unix time in milliseconds followed by random bits sliced
+        from a pre-filled os.urandom pool.
+        """
+        if self._pool_idx + _TASK_ID_RANDOM_BYTES > len(self._entropy_pool):
+            self._entropy_pool = os.urandom(_ENTROPY_POOL_SIZE)
+            self._pool_idx = 0
+        start = self._pool_idx
+        self._pool_idx = start + _TASK_ID_RANDOM_BYTES
+        random_bits = int.from_bytes(self._entropy_pool[start : self._pool_idx])
+
+        value = (time.time_ns() // 1_000_000) << 80 | random_bits
+        # Проставляем версию (7) и вариант (0b10)
+        value = (value & ~(0xF << 76)) | (0x7 << 76)
+        value = (value & ~(0x3 << 62)) | (0x2 << 62)
+        return str(UUID(int=value))
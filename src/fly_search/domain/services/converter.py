@@ -2,10 +2,13 @@
 
 from __future__ import annotations
 
+import sys
 from collections import defaultdict
-from collections.abc import Iterable
+from collections.abc import Mapping
 from dataclasses import dataclass
 from datetime import UTC, datetime
+from operator import itemgetter
+from types import MappingProxyType
 from typing import Any
 
 from av_parser.models import (
@@ -22,6 +25,16 @@ from av_parser.models import (
 
 ProviderChunk = dict[str, Any]
 
+# Общий пустой default для цепочек .get(), чтобы не создавать новый dict на каждый вызов
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+_BY_VALUE = itemgetter(1)
+# Коды аэропортов и перевозчиков повторяются из оффера в оффер - храним по одной копии
+_intern = sys.intern
+# Модели заморожены, поэтому пустые правила и багаж можно разделять между тарифами
+_EMPTY_RULE = RuleInfo(available=False, is_from_config=False)
+_EMPTY_RULES = Rules(return_before_flight=_EMPTY_RULE, change_before_flight=_EMPTY_RULE)
+_EMPTY_BAGGAGE_INFO = BaggageInfo(count=0, weight=None)
+
 
 @dataclass(slots=True)
 class FlightOfferConverter:
@@ -37,10 +50,10 @@ class FlightOfferConverter:
         offers_by_key: dict[str, list[FlightOffer]] = defaultdict(list)
 
         for ticket in chunk.get("tickets", []):
-            offer = self._build_offer(ticket, agents, flight_legs)
-            if offer is None:
+            built = self._build_offer(ticket, agents, flight_legs)
+            if built is None:
                 continue
-            route_key = self._build_route_key(offer)
+            route_key, offer = built
             offers_by_key[route_key].append(offer)
         return offers_by_key
 
@@ -49,8 +62,10 @@ class FlightOfferConverter:
         ticket: dict[str, Any],
         agents: dict[str, str],
         flight_legs: list[dict[str, Any]],
-    ) -> FlightOffer | None:
-        proposals = ticket.get("proposals", [])
+    ) -> tuple[str, FlightOffer] | None:
+        """Build an offer together with its route key, or None if ticket is unusable."""
+        ticket_get = ticket.get
+        proposals = ticket_get("proposals", [])
         if not proposals:
             return None
 
@@ -58,16 +73,16 @@ class FlightOfferConverter:
         if not segments:
             return None
 
-        fares = self._build_fares(proposals, agents)
+        fares, prices = self._build_fares_and_prices(proposals, agents)
         if not fares:
             return None
 
-        prices = self._collect_prices(proposals, agents)
         min_provider, min_price = self._extract_min_price(prices)
 
-        return FlightOffer(
+        # Ключ маршрута считаем по уже построенному первому сегменту
+        return self._build_route_key(segments[0]), FlightOffer(
             is_vtrip=self._is_vtrip(segments),
-            key=ticket.get("signature") or ticket.get("hashsum") or ticket.get("id", ""),
+            key=ticket_get("signature") or ticket_get("hashsum") or ticket_get("id", ""),
             flight_info=FlightInfo(forward=segments),
             fares=fares,
             prices=prices,
@@ -83,47 +98,54 @@ class FlightOfferConverter:
         flight_legs: list[dict[str, Any]],
     ) -> list[FlightSegment]:
         segments: list[FlightSegment] = []
-        proposal_terms = proposals[0].get("flight_terms", {})
-        for segment in ticket.get("segments", []):
-            for flight_index in segment.get("flights", []):
-                leg = self._safe_index(flight_legs, flight_index)
+        # Локальные ссылки вместо поиска атрибутов на каждой итерации
+        terms_get = proposals[0].get("flight_terms", _EMPTY).get
+        format_date = self._format_date
+        compute_duration = self._compute_duration
+        legs_count = len(flight_legs)
+        for segment in ticket.get("segments", ()):
+            for flight_index in segment.get("flights", ()):
+                if flight_index < 0 or flight_index >= legs_count:
+                    continue
+                leg = flight_legs[flight_index]
                 if not leg:
                     continue
-                term = proposal_terms.get(str(flight_index), {})
+                term = terms_get(str(flight_index), _EMPTY)
+                marketing = term.get("marketing_carrier_designator") or _EMPTY
+                operating = leg.get("operating_carrier_designator") or _EMPTY
                 segments.append(
                     FlightSegment(
-                        departure=leg.get("origin", ""),
-                        arrival=leg.get("destination", ""),
-                        departure_date=self._format_date(leg.get("local_departure_date_time")),
-                        arrival_date=self._format_date(leg.get("local_arrival_date_time")),
-                        duration=self._compute_duration(
+                        departure=_intern(leg.get("origin", "")),
+                        arrival=_intern(leg.get("destination", "")),
+                        departure_date=format_date(leg.get("local_departure_date_time")),
+                        arrival_date=format_date(leg.get("local_arrival_date_time")),
+                        duration=compute_duration(
                             leg.get("departure_unix_timestamp"),
                             leg.get("arrival_unix_timestamp"),
                         ),
-                        number=term.get("marketing_carrier_designator", {}).get("number", ""),
-                        marketing_carrier=term.get("marketing_carrier_designator", {}).get(
-                            "carrier", ""
-                        ),
-                        operating_carrier=leg.get("operating_carrier_designator", {}).get(
-                            "carrier", ""
-                        ),
+                        number=_intern(marketing.get("number", "")),
+                        marketing_carrier=_intern(marketing.get("carrier", "")),
+                        operating_carrier=_intern(operating.get("carrier", "")),
                     )
                 )
         return segments
 
-    def _build_fares(
+    def _build_fares_and_prices(
         self,
         proposals: list[dict[str, Any]],
         agents: dict[str, str],
-    ) -> list[Fare]:
+    ) -> tuple[list[Fare], dict[str, int]]:
+        """Build fares and per-agent prices in a single pass over proposals."""
         fares: list[Fare] = []
+        prices: dict[str, int] = {}
         for proposal in proposals:
-            min_fare = proposal.get("minimum_fare", {})
-            trip_class = self._resolve_trip_class(proposal)
-            agent_key = self._agent_key(str(proposal.get("agent_id")), agents)
+            min_fare = proposal.get("minimum_fare", _EMPTY)
+            agent_id = str(proposal.get("agent_id"))
+            agent_name = agents.get(agent_id, agent_id)
+            price = int(proposal.get("price", _EMPTY).get("value", 0))
             fare_info = FareInfo(
                 fare_code=min_fare.get("fare_code") or min_fare.get("code", ""),
-                trip_class=trip_class,
+                trip_class=self._resolve_trip_class(proposal),
                 baggage=self._build_baggage(min_fare),
                 rules=self._build_rules(min_fare),
             )
@@ -131,48 +153,33 @@ class FlightOfferConverter:
                 Fare(
                     fare_key=min_fare.get("fare_key", ""),
                     fare_info=[fare_info],
-                    prices={agent_key: int(proposal.get("price", {}).get("value", 0))},
+                    prices={agent_name: price},
                 )
             )
-        return fares
-
-    def _collect_prices(
-        self,
-        proposals: list[dict[str, Any]],
-        agents: dict[str, str],
-    ) -> dict[str, int]:
-        prices: dict[str, int] = {}
-        for proposal in proposals:
-            agent_id = str(proposal.get("agent_id"))
-            agent_name = self._agent_key(agent_id, agents)
-            prices[agent_name] = int(proposal.get("price", {}).get("value", 0))
-        return prices
+            prices[agent_name] = price
+        return fares, prices
 
     def _extract_min_price(self, prices: dict[str, int]) -> tuple[str, int]:
         if not prices:
             return "", 0
-        min_provider = min(prices, key=prices.get)
-        return min_provider, prices[min_provider]
+        return min(prices.items(), key=_BY_VALUE)
 
     @staticmethod
     def _compute_duration(departure_ts: Any, arrival_ts: Any) -> int:
         if not departure_ts or not arrival_ts:
             return 0
-        return int((int(arrival_ts) - int(departure_ts)) / 60)
+        return (int(arrival_ts) - int(departure_ts)) // 60
 
     @staticmethod
-    def _is_vtrip(segments: Iterable[FlightSegment]) -> bool:
+    def _is_vtrip(segments: list[FlightSegment]) -> bool:
         """
         Check if trip is virtual (vtrip).
 
         Conditions: len(FlightSegment) > 1 AND marketing_carrier != operating_carrier
         in any segment.
         """
-        segments_list = list(segments)
-        if len(segments_list) <= 1:
-            return False
-        return any(
-            seg.marketing_carrier != seg.operating_carrier for seg in segments_list
+        return len(segments) > 1 and any(
+            seg.marketing_carrier != seg.operating_carrier for seg in segments
         )
 
     @staticmethod
@@ -183,24 +190,20 @@ class FlightOfferConverter:
 
     @staticmethod
     def _build_baggage(min_fare: dict[str, Any]) -> Baggage:
-        handbags = min_fare.get("handbags") or {}
-        baggage = min_fare.get("baggage") or {}
         return Baggage(
-            handbags=BaggageInfo(
-                count=int(handbags.get("count", 0)),
-                weight=_int_or_none(handbags.get("weight")),
-            ),
-            baggage=BaggageInfo(
-                count=int(baggage.get("count", 0)),
-                weight=_int_or_none(baggage.get("weight")),
-            ),
+            handbags=_build_baggage_info(min_fare.get("handbags")),
+            baggage=_build_baggage_info(min_fare.get("baggage")),
         )
 
     @staticmethod
     def _build_rules(min_fare: dict[str, Any]) -> Rules:
+        return_before = min_fare.get("return_before_flight")
+        change_before = min_fare.get("change_before_flight")
+        if not return_before and not change_before:
+            return _EMPTY_RULES
         return Rules(
-            return_before_flight=_build_rule(min_fare.get("return_before_flight")),
-            change_before_flight=_build_rule(min_fare.get("change_before_flight")),
+            return_before_flight=_build_rule(return_before),
+            change_before_flight=_build_rule(change_before),
         )
 
     @staticmethod
@@ -208,49 +211,55 @@ class FlightOfferConverter:
         if not value:
             return ""
         if isinstance(value, str):
+            # Провайдер отдаёт "YYYY-MM-DD HH:MM" - меняем разделитель срезом без поиска
+            if len(value) > 10 and value[10] == " ":
+                return f"{value[:10]}T{value[11:]}"
             return value.replace(" ", "T")
         if isinstance(value, int | float):
             return datetime.fromtimestamp(value, tz=UTC).isoformat()
         return str(value)
 
     @staticmethod
-    def _build_route_key(offer: FlightOffer) -> str:
-        if not offer.flight_info.forward:
-            return ""
-        first_segment = offer.flight_info.forward[0]
-        departure_date = first_segment.departure_date[:10].replace("-", "")
-        return f"{first_segment.departure}{first_segment.arrival}{departure_date}"
+    def _build_route_key(first_segment: FlightSegment) -> str:
+        date = first_segment.departure_date
+        return _intern(
+            f"{first_segment.departure}{first_segment.arrival}{date[0:4]}{date[5:7]}{date[8:10]}"
+        )
 
     @staticmethod
     def _extract_agents(chunk: ProviderChunk) -> dict[str, str]:
-        agents = {}
-        raw_agents = chunk.get("agents", {})
-        for agent_id, agent_data in raw_agents.items():
-            label = agent_data.get("label", {}).get("ru", {}).get("default")
-            agents[str(agent_id)] = label or str(agent_id)
-        return agents
-
-    @staticmethod
-    def _agent_key(agent_id: str, agents: dict[str, str]) -> str:
-        return agents.get(agent_id, agent_id)
-
-    @staticmethod
-    def _safe_index(items: list[dict[str, Any]], index: int) -> dict[str, Any] | None:
-        if index < 0 or index >= len(items):
-            return None
-        return items[index]
+        return {
+            str(agent_id): (
+                agent_data.get("label", _EMPTY).get("ru", _EMPTY).get("default") or str(agent_id)
+            )
+            for agent_id, agent_data in chunk.get("agents", _EMPTY).items()
+        }
 
 
 def _int_or_none(value: Any) -> int | None:
+    # Вес багажа часто отсутствует - обрабатываем частые случаи без исключений
+    if value is None:
+        return None
+    if type(value) is int:
+        return value
     try:
         return int(value)
     except (TypeError, ValueError):
         return None
 
 
+def _build_baggage_info(data: dict[str, Any] | None) -> BaggageInfo:
+    if not data:
+        return _EMPTY_BAGGAGE_INFO
+    return BaggageInfo(
+        count=int(data.get("count", 0)),
+        weight=_int_or_none(data.get("weight")),
+    )
+
+
 def _build_rule(data: dict[str, Any] | None) -> RuleInfo:
     if not data:
-        return RuleInfo(available=False, is_from_config=False)
+        return _EMPTY_RULE
     return RuleInfo(
         available=bool(data.get("available")),
         is_from_config=bool(data.get("is_from_config")),
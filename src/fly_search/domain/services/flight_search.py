@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import heapq
 import logging
-from uuid import uuid4
+import secrets
+from itertools import count
+from operator import itemgetter
 
 from av_parser.models import FlightOffer, ServiceResponse
 
@@ -12,6 +15,10 @@ from .converter import FlightOfferConverter
 
 logger = logging.getLogger(__name__)
 
+# (-min_price, -порядковый номер, оффер): корень кучи - самый дорогой и самый поздний
+_HeapEntry = tuple[int, int, FlightOffer]
+_HEAP_ORDER = itemgetter(0, 1)
+
 
 class FlightSearchService:
     """Fetch and adapt search results from the Avia API provider."""
@@ -24,8 +31,23 @@ class FlightSearchService:
         self._avia_api = avia_api
         self._converter = converter or FlightOfferConverter()
 
-    async def get_offers(self, pid: str | None = None) -> ServiceResponse:
-        """Execute search and return normalized response."""
+    async def get_offers(
+        self, pid: str | None = None, top_k: int | None = None
+    ) -> ServiceResponse:
+        """
+        Execute search and return normalized response.
+
+        Args:
+            pid: Process identifier (generated if not provided)
+            top_k: Keep only the k cheapest offers per route, sorted by price
+                (all offers in arrival order if None)
+
+        Returns:
+            ServiceResponse with offers grouped by route key
+        """
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be a positive integer")
+
         process_id = pid or self._generate_pid()
         start_response = await self._avia_api.start_search()
         logger.info("start_search finished", extra={"pid": process_id, "response": start_response})
@@ -40,13 +62,26 @@ class FlightSearchService:
             return ServiceResponse(success=False, pid=process_id, result={})
 
         aggregated: dict[str, list[FlightOffer]] = {}
+        # Для top_k держим по маршруту ограниченную кучу вместо полного списка
+        heaps: dict[str, list[_HeapEntry]] = {}
+        sequence = count()
         async for chunk in self._avia_api.get_chunk(task_id):
             offers = self._convert_chunk(chunk, process_id)
-            aggregated = self._merge_offers(aggregated, offers)
-            logger.debug(
-                "chunk processed",
-                extra={"pid": process_id, "chunk_offers": sum(len(v) for v in offers.values())},
-            )
+            if top_k is None:
+                aggregated = self._merge_offers(aggregated, offers)
+            else:
+                self._merge_top_k(heaps, offers, top_k, sequence)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "chunk processed",
+                    extra={
+                        "pid": process_id,
+                        "chunk_offers": sum(len(v) for v in offers.values()),
+                    },
+                )
+
+        if top_k is not None:
+            aggregated = self._drain_heaps(heaps)
 
         success = any(aggregated.values())
         return ServiceResponse(success=success, pid=process_id, result=aggregated)
@@ -75,14 +110,48 @@ class FlightSearchService:
         target: dict[str, list[FlightOffer]],
         new: dict[str, list[FlightOffer]],
     ) -> dict[str, list[FlightOffer]]:
-        """Merge new offers into target, returning new dict (immutable)."""
-        result = {key: offers.copy() for key, offers in target.items()}
+        """
+        Merge new offers into target in place and return it.
+
+        Lists from `new` may be adopted as is, so `new` must not be reused.
+        """
+        if not target:
+            target.update(new)
+            return target
         for key, offers in new.items():
-            if key not in result:
-                result[key] = []
-            result[key].extend(offers)
-        return result
+            target.setdefault(key, []).extend(offers)
+        return target
+
+    @staticmethod
+    def _merge_top_k(
+        heaps: dict[str, list[_HeapEntry]],
+        new: dict[str, list[FlightOffer]],
+        top_k: int,
+        sequence: count[int],
+    ) -> None:
+        """
+        Push new offers into bounded per-route heaps.
+
+        The heap root is the most expensive offer (the latest one among equal
+        prices), so it is the one evicted once a route holds top_k offers.
+        """
+        for key, offers in new.items():
+            heap = heaps.setdefault(key, [])
+            for offer in offers:
+                entry = (-offer.min_price, -next(sequence), offer)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heappushpop(heap, entry)
+
+    @staticmethod
+    def _drain_heaps(heaps: dict[str, list[_HeapEntry]]) -> dict[str, list[FlightOffer]]:
+        """Turn per-route heaps into offer lists sorted by price, then arrival."""
+        return {
+            key: [entry[2] for entry in sorted(heap, key=_HEAP_ORDER, reverse=True)]
+            for key, heap in heaps.items()
+        }
 
     @staticmethod
     def _generate_pid() -> str:
-        return uuid4().hex
+        return secrets.token_hex(16)
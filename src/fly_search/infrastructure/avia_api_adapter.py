@@ -4,67 +4,98 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import threading
+import weakref
 from collections.abc import AsyncIterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 from av_parser.api_service import AviaApi
 
+from ..config import get_settings
 from ..domain.ports.avia_api import ProviderChunk, StartSearchResponse
 
 logger = logging.getLogger(__name__)
 
+# Как часто поток, ждущий места в буфере, проверяет, не ушёл ли потребитель
+_SLOT_WAIT_INTERVAL = 1.0
+
 
 class AviaApiAdapter:
     """
     Adapter wrapping AviaApi implementation to conform to the protocol.
 
     Note: AviaApi.get_chunk() uses blocking sleep(15) which blocks the event loop.
-    This adapter isolates it in a separate thread.
+    This adapter isolates it in a pool of worker threads owned by the adapter.
 
-    Thread limiting: Uses Semaphore to limit the number of concurrent generator
-    threads (configurable via settings).
-    """
+    Thread limiting: Uses a Semaphore per running event loop to limit the number
+    of concurrent generator threads (configurable via settings). The pool has the
+    same size, and a slot is freed only when its thread has actually finished.
 
-    _thread_semaphore: asyncio.Semaphore | None = None
+    Pool workers are not daemon threads: interpreter exit waits for them. A worker
+    stops before the next chunk once its consumer is gone or the main loop is
+    closed, so exit may wait for at most one provider sleep per running search.
+
+    AviaApi keeps a per-search chunk cursor, so unless an instance is injected
+    a fresh one is created for every call. This keeps a single adapter safe to
+    share between requests.
+    """
 
     def __init__(
         self,
         avia_api: AviaApi | None = None,
         max_threads: int | None = None,
-        chunk_queue_timeout: float | None = None,
         thread_join_timeout: float | None = None,
+        chunk_queue_size: int | None = None,
     ) -> None:
         """
         Initialize adapter with optional AviaApi instance.
 
         Args:
-            avia_api: AviaApi instance to use
+            avia_api: AviaApi instance to reuse for every call (new one per call if None)
             max_threads: Maximum number of concurrent threads
-            chunk_queue_timeout: Timeout for getting chunk from queue
             thread_join_timeout: Timeout for waiting thread completion
+            chunk_queue_size: Maximum number of chunks buffered ahead of the consumer
         """
-        from fly_search.config import get_settings
-
-        self._api = avia_api or AviaApi()
+        self._api = avia_api
         settings = get_settings()
 
         # Используем переданные значения или значения из конфига
         self._max_threads = (
             max_threads if max_threads is not None else settings.max_concurrent_threads
         )
-        self._chunk_queue_timeout = (
-            chunk_queue_timeout if chunk_queue_timeout is not None else settings.chunk_queue_timeout
-        )
         self._thread_join_timeout = (
             thread_join_timeout if thread_join_timeout is not None else settings.thread_join_timeout
         )
+        self._chunk_queue_size = (
+            chunk_queue_size if chunk_queue_size is not None else settings.chunk_queue_size
+        )
 
-        if AviaApiAdapter._thread_semaphore is None:
-            AviaApiAdapter._thread_semaphore = asyncio.Semaphore(self._max_threads)
+        # Потоки генераторов переиспользуются между поисками вместо Thread на каждый
+        # вызов; размер пула равен лимиту Semaphore, поэтому задачи не ждут в пуле молча
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_threads,
+            thread_name_prefix="avia-gen",
+        )
+        # Semaphore привязан к event loop, поэтому храним свой экземпляр на каждый loop;
+        # слабые ссылки не дают закрытым loop (reload, тесты) копиться в памяти
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+
+    def _get_api(self) -> AviaApi:
+        return self._api or AviaApi()
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        """Return the thread-limiting semaphore bound to the given event loop."""
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(loop, asyncio.Semaphore(self._max_threads))
+        return semaphore
 
     async def start_search(self) -> StartSearchResponse:
         """Start search and return metadata."""
         try:
-            result = await self._api.start_search()
+            result = await self._get_api().start_search()
             return StartSearchResponse(
                 success=result.get("success", False),
                 task_id=result.get("task_id", ""),
@@ -86,42 +117,63 @@ class AviaApiAdapter:
         blocking sleep(15) from the event loop. This allows FastAPI to handle
         other requests (including healthcheck) while waiting for chunks.
         """
-        import queue as std_queue
-        import threading
-
-        # Используем стандартную очередь для потокобезопасной передачи данных между потоками
-        chunk_queue: std_queue.Queue[ProviderChunk | Exception | None] = std_queue.Queue()
-        gen = self._api.get_chunk(task_id)
+        # Очередь принадлежит основному event loop: поток кладёт в неё чанки через
+        # call_soon_threadsafe, а потребитель просто ждёт get() без опроса по таймауту
+        main_loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue[ProviderChunk | Exception | None] = asyncio.Queue()
+        # Размер буфера ограничиваем семафором потока: поток ждёт свободный слот сам,
+        # не завися от основного loop (он может быть занят ожиданием потока в finally)
+        free_slots = threading.Semaphore(self._chunk_queue_size)
+        stopped = threading.Event()
+        gen = self._get_api().get_chunk(task_id)
         thread_error: Exception | None = None
 
+        def _put(item: ProviderChunk | Exception | None) -> bool:
+            """Hand item over to the main event loop; return False if nobody can receive it."""
+            try:
+                main_loop.call_soon_threadsafe(chunk_queue.put_nowait, item)
+            except RuntimeError:
+                # Основной loop уже закрыт - передавать результат некому, останавливаем поток
+                stopped.set()
+                return False
+            return True
+
+        def _wait_free_slot() -> bool:
+            """Wait for buffer space; return False once the consumer is gone."""
+            # Ждём с таймаутом: если генератор потребителя так и не финализируется
+            # (loop закрыт), stopped никто не выставит и release не случится
+            while not free_slots.acquire(timeout=_SLOT_WAIT_INTERVAL):
+                if stopped.is_set() or main_loop.is_closed():
+                    return False
+            return not stopped.is_set()
+
+        async def _consume_generator() -> None:
+            """Consume generator and put chunks into queue."""
+            try:
+                async for chunk in gen:
+                    # Фильтруем пустые чанки
+                    if not chunk:
+                        continue
+                    if not _wait_free_slot() or not _put(chunk):
+                        # Потребитель ушёл - дальше генератор не читаем
+                        break
+            except Exception as e:
+                logger.error(
+                    "Error processing chunk in thread",
+                    exc_info=True,
+                    extra={"task_id": task_id, "error": str(e)},
+                )
+                _put(e)
+            finally:
+                _put(None)  # Сигнал завершения
+
         def _run_generator_in_thread() -> None:
             """Run async generator in separate thread to isolate blocking sleep."""
             nonlocal thread_error
-            loop: asyncio.AbstractEventLoop | None = None
             try:
-                # Создаём новый event loop для этого потока
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-                async def _consume_generator() -> None:
-                    """Consume generator and put chunks into queue."""
-                    try:
-                        async for chunk in gen:
-                            # Фильтруем пустые чанки
-                            if chunk:
-                                chunk_queue.put(chunk)
-                    except Exception as e:
-                        logger.error(
-                            "Error processing chunk in thread",
-                            exc_info=True,
-                            extra={"task_id": task_id, "error": str(e)},
-                        )
-                        chunk_queue.put(e)
-                    finally:
-                        chunk_queue.put(None)  # Сигнал завершения
-
-                # Запускаем async generator в event loop потока
-                loop.run_until_complete(_consume_generator())
+                # asyncio.run сам создаёт loop потока, закрывает генераторы и отменяет
+                # незавершённые задачи - ручное управление loop не нужно
+                asyncio.run(_consume_generator())
             except Exception as e:
                 logger.error(
                     "Critical error in generator thread",
@@ -129,57 +181,42 @@ class AviaApiAdapter:
                     extra={"task_id": task_id, "error": str(e)},
                 )
                 thread_error = e
-                chunk_queue.put(e)
-            finally:
-                # Закрываем event loop
-                if loop is not None:
-                    try:
-                        # Отменяем все незавершённые задачи
-                        pending = asyncio.all_tasks(loop)
-                        for task in pending:
-                            task.cancel()
-                        # Ждём завершения отменённых задач
-                        if pending:
-                            loop.run_until_complete(
-                                asyncio.gather(*pending, return_exceptions=True)
-                            )
-                    except Exception as e:
-                        logger.warning("Error cancelling tasks in thread", extra={"error": str(e)})
-                    finally:
-                        try:
-                            loop.close()
-                        except Exception as e:
-                            logger.warning(
-                                "Error closing event loop", extra={"error": str(e)}
-                            )
-
-        # Запускаем генератор в отдельном потоке (daemon, чтобы не блокировать завершение)
-        # threading.Thread используется вместо asyncio.to_thread() потому что:
+                _put(e)
+
+        # Запускаем генератор в потоке пула адаптера
+        # Пул используется вместо asyncio.to_thread() потому что:
         # 1. to_thread() ждёт завершения, а нам нужен streaming
         # 2. Нужно отдавать чанки по мере поступления через очередь
         # 3. Semaphore ограничивает количество одновременных потоков
 
-        # Получаем доступ к Semaphore (ограничение потоков)
-        semaphore = AviaApiAdapter._thread_semaphore
-        if semaphore is None:
-            semaphore = asyncio.Semaphore(self._max_threads)
-            AviaApiAdapter._thread_semaphore = semaphore
+        # Получаем Semaphore текущего event loop (ограничение потоков)
+        semaphore = self._get_semaphore(main_loop)
 
-        # Ждём доступного слота в Semaphore перед созданием потока
+        # Ждём доступного слота в Semaphore перед запуском в пуле
         await semaphore.acquire()
 
-        thread = threading.Thread(target=_run_generator_in_thread, daemon=True)
-        thread.start()
+        try:
+            future = self._executor.submit(_run_generator_in_thread)
+        except RuntimeError:
+            # Пул уже остановлен (завершение процесса)
+            semaphore.release()
+            raise
+
+        def _release_slot(_: Future[None]) -> None:
+            """Free the semaphore slot once the thread has really finished."""
+            try:
+                main_loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # Loop закрыт - его Semaphore больше никому не нужен
+                pass
+
+        # Слот освобождается по завершении потока, а не по таймауту ожидания в finally:
+        # иначе пул заполнялся бы ещё работающими потоками
+        future.add_done_callback(_release_slot)
 
         try:
             while True:
-                # Ждём чанк с периодической отдачей управления event loop
-                try:
-                    chunk = chunk_queue.get(timeout=self._chunk_queue_timeout)
-                except std_queue.Empty:
-                    # Отдаём управление event loop для обработки других запросов
-                    await asyncio.sleep(0)
-                    continue
+                chunk = await chunk_queue.get()
 
                 if chunk is None:
                     # Генератор завершился
@@ -194,6 +231,7 @@ class AviaApiAdapter:
                     )
                     raise chunk
 
+                free_slots.release()
                 yield chunk
 
                 # Проверяем ошибки потока после yield
@@ -213,18 +251,13 @@ class AviaApiAdapter:
             )
             raise
         finally:
+            # Будим поток, если он ждёт места в буфере, и просим его остановиться
+            stopped.set()
+            free_slots.release()
             # Ждём завершения потока (с таймаутом)
-            thread.join(timeout=self._thread_join_timeout)
-            if thread.is_alive():
+            wait((future,), timeout=self._thread_join_timeout)
+            if not future.done():
                 logger.warning(
                     "Generator thread did not finish within timeout",
                     extra={"task_id": task_id},
                 )
-            # Освобождаем Semaphore после завершения (или таймаута)
-            try:
-                semaphore.release()
-            except Exception as e:
-                logger.warning(
-                    "Error releasing semaphore",
-                    extra={"task_id": task_id, "error": str(e)},
-                )
@@ -74,7 +74,7 @@ class BackgroundTaskManager:
         task_id = await self._task_service.start_task(pid=pid)
 
         # Сохраняем задачу в кеш со статусом processing
-        self._cache_service.set_task(
+        await self._cache_service.aset_task(
             task_id,
             {
                 "status": TaskStatus.PROCESSING,
@@ -102,7 +102,7 @@ class BackgroundTaskManager:
             result = await self._task_service.execute_search(task_id, pid)
 
             # Сохраняем успешный результат
-            self._cache_service.set_task(
+            await self._cache_service.aset_task(
                 task_id,
                 {
                     "status": TaskStatus.COMPLETED,
@@ -123,7 +123,7 @@ class BackgroundTaskManager:
 
         except Exception as e:
             # Сохраняем ошибку
-            self._cache_service.set_task(
+            await self._cache_service.aset_task(
                 task_id,
                 {
                     "status": TaskStatus.FAILED,
@@ -2,21 +2,46 @@
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import json
+import logging
 import os
 import tempfile
 import time
-from collections.abc import Callable
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
 from pathlib import Path
 from typing import Any, TypeVar
 
-from cachetools import TTLCache
+import orjson
+from cachetools import LFUCache, TTLCache
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from av_parser.models import ServiceResponse
 
 from ..config import get_settings
 
+logger = logging.getLogger(__name__)
+
+# Часы кеша ответов; свой псевдоним, чтобы тесты подменяли только их, а не time.monotonic
+_monotonic = time.monotonic
+
 T = TypeVar("T")
 
+# Одиночный строковый параметр короче этого кладём в ключ как есть, без хеширования
+_MAX_RAW_KEY_VALUE_LENGTH = 200
+
+
+def _read_umask() -> int:
+    """Return the process umask (os.umask can only be read by setting it)."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# mkstemp создаёт файлы с правами 0600; файлам задач выставляем права, как у open()
+_TASK_FILE_MODE = 0o666 & ~_read_umask()
+
 
 class CacheService:
     """
@@ -46,14 +71,21 @@ class CacheService:
 
         # Response cache (for get_flights results) - 3 minutes default
         # In-memory cache, works within single process
-        self._response_cache = TTLCache(
+        # Храним (значение, срок годности) и проверяем срок при чтении - попадание
+        # в кеш обходится без обслуживания списка истечения TTLCache.
+        # При переполнении вытесняем редко запрашиваемые pid, а не давно записанные:
+        # горячие маршруты остаются в кеше
+        self._response_cache = _ResponseLFUCache(
             maxsize=response_cache_size or settings.cache_response_size,
-            ttl=response_cache_ttl or settings.cache_response_ttl,
         )
+        self._response_cache_ttl = response_cache_ttl or settings.cache_response_ttl
+        # Вычисления ответов в процессе: конкурентные промахи по одному ключу ждут их
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
 
         # Task cache (for background tasks) - 1 hour default
-        # In-memory cache for single process
-        self._task_cache = TTLCache(
+        # In-memory cache for single process, falls back to the file cache on miss
+        self._task_cache = _TaskTTLCache(
+            loader=self._load_task_from_file,
             maxsize=task_cache_size or settings.cache_task_size,
             ttl=task_cache_ttl or settings.cache_task_ttl,
         )
@@ -66,8 +98,11 @@ class CacheService:
         self._task_cache_dir.mkdir(parents=True, exist_ok=True)
         self._task_cache_ttl = task_cache_ttl or settings.cache_task_ttl
 
-        # Очищаем старые файлы при инициализации
-        self._cleanup_old_task_files()
+        # Очистка старых файлов не чаще раза в ttl/4 на все процессы: время последней
+        # очистки хранится в mtime файла-метки, проверка запускается из set_task
+        self._cleanup_interval = self._task_cache_ttl / 4
+        self._cleanup_sentinel = self._task_cache_dir / ".last_cleanup"
+        self._next_cleanup_check = 0.0
 
     def get_response(self, key: str) -> Any | None:
         """
@@ -79,7 +114,14 @@ class CacheService:
         Returns:
             Cached value or None if not found/expired
         """
-        return self._response_cache.get(key)
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if _monotonic() >= expires_at:
+            self._response_cache.pop(key, None)
+            return None
+        return value
 
     def set_response(self, key: str, value: Any) -> None:
         """
@@ -89,19 +131,104 @@ class CacheService:
             key: Cache key
             value: Value to cache
         """
-        self._response_cache[key] = value
+        now = _monotonic()
+        # Сначала выбрасываем истёкшие записи: иначе бывшие популярные ключи
+        # с большим счётчиком обращений занимали бы место бессрочно
+        self._response_cache.expire(now)
+        self._response_cache[key] = (value, now + self._response_cache_ttl)
 
-    def _cleanup_old_task_files(self) -> None:
-        """Remove expired task cache files."""
-        current_time = time.time()
-        for task_file in self._task_cache_dir.glob("*.json"):
+    async def get_or_set_response(self, key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        """
+        Return cached response or compute it once for all concurrent callers.
+
+        Args:
+            key: Cache key
+            compute: Coroutine factory producing the value on cache miss
+
+        Returns:
+            Cached or freshly computed value
+        """
+        while True:
+            # Одно обращение к кешу на запрос: вызывающему не нужен свой get_response
+            cached = self.get_response(key)
+            if cached is not None:
+                logger.info(
+                    "Response cache hit",
+                    extra={"event": "cache_hit", "cache_key": key},
+                )
+                return cached
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+
+            # Этот ключ уже вычисляется - ждём чужой результат вместо повторного запроса;
+            # shield, чтобы отмена одного ожидающего не отменяла общий future
             try:
-                with open(task_file, encoding="utf-8") as f:
-                    data = json.load(f)
-                    if current_time - data.get("timestamp", 0) > self._task_cache_ttl:
-                        task_file.unlink(missing_ok=True)
-            except (json.JSONDecodeError, OSError, KeyError):
-                task_file.unlink(missing_ok=True)
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Отменили сам ожидающий запрос - пробрасываем отмену
+                current = asyncio.current_task()
+                if not inflight.cancelled() or (current is not None and current.cancelling()):
+                    raise
+                # Отменили чужой вычисляющий запрос - повторяем поиск и считаем сами
+
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Помечаем исключение полученным, даже если ожидающих не было
+            future.exception()
+            raise
+        else:
+            self.set_response(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    def _maybe_cleanup_task_files(self) -> None:
+        """Run expired files cleanup unless some process did it recently."""
+        now = time.time()
+        if now < self._next_cleanup_check:
+            return
+        self._next_cleanup_check = now + self._cleanup_interval
+
+        try:
+            if now - self._cleanup_sentinel.stat().st_mtime < self._cleanup_interval:
+                return
+        except OSError:
+            # Метки ещё нет - очистка ни разу не запускалась
+            pass
+
+        self._cleanup_old_task_files()
+        try:
+            self._cleanup_sentinel.touch()
+        except OSError:
+            pass
+
+    def _cleanup_old_task_files(self) -> None:
+        """Remove expired task cache files and temporary files left by interrupted writes."""
+        # Возраст файла берём из mtime - файлы не открываем
+        expire_before = time.time() - self._task_cache_ttl
+        # scandir отдаёт DirEntry без создания Path на каждый файл
+        with os.scandir(self._task_cache_dir) as entries:
+            for entry in entries:
+                # .tmp остаются, если процесс упал между mkstemp и os.replace
+                if not entry.name.endswith((".json", ".tmp")):
+                    continue
+                try:
+                    if entry.stat().st_mtime < expire_before:
+                        os.unlink(entry.path)
+                except OSError:
+                    continue
 
     def get_task(self, task_id: str) -> dict[str, Any] | None:
         """
@@ -115,55 +242,44 @@ class CacheService:
         Returns:
             Task data dict or None if not found/expired
         """
-        # Сначала проверяем in-memory кеш
-        cached = self._task_cache.get(task_id)
-        if cached is not None:
-            return cached
+        # Промах in-memory кеша сам подгружает задачу из файла (см. _TaskTTLCache)
+        try:
+            return self._task_cache[task_id]
+        except KeyError:
+            return None
+
+    def _load_task_from_file(self, task_id: str) -> dict[str, Any] | None:
+        """
+        Load task data from the file cache shared between Gunicorn workers.
+
+        Args:
+            task_id: Task identifier
 
-        # Проверяем файловый кеш (для работы между Gunicorn workers)
+        Returns:
+            Task data dict or None if file is missing, expired or corrupted
+        """
         task_file = self._task_cache_dir / f"{task_id}.json"
-        if not task_file.exists():
+        try:
+            # Проверяем TTL по mtime, не читая просроченный файл
+            if time.time() - task_file.stat().st_mtime > self._task_cache_ttl:
+                task_file.unlink(missing_ok=True)
+                return None
+        except OSError:
+            # Файла нет - задача не найдена
             return None
 
         try:
-            with open(task_file, encoding="utf-8") as f:
-                data = json.load(f)
-                # Проверяем TTL
-                if time.time() - data.get("timestamp", 0) > self._task_cache_ttl:
-                    task_file.unlink(missing_ok=True)
-                    return None
-                # Восстанавливаем task_data из JSON
-                task_data = data.get("data")
-                if not task_data:
-                    return None
-
-                # Восстанавливаем ServiceResponse из dict если нужно
-                # Проверяем, что result - это dict с полями ServiceResponse
-                if (
-                    "result" in task_data
-                    and isinstance(task_data["result"], dict)
-                    and "success" in task_data["result"]
-                    and "pid" in task_data["result"]
-                    and "result" in task_data["result"]
-                ):
-                    from av_parser.models import ServiceResponse
-
-                    try:
-                        # Восстанавливаем ServiceResponse из dict
-                        task_data["result"] = ServiceResponse.model_validate(
-                            task_data["result"]
-                        )
-                    except Exception:
-                        # Если не получилось, оставляем как dict
-                        pass
-
-                # Сохраняем в in-memory кеш для быстрого доступа
-                self._task_cache[task_id] = task_data
-                return task_data
-        except (json.JSONDecodeError, OSError, KeyError):
+            # Разбираем сырые байты файла сразу в модели - без промежуточного dict
+            # и повторной валидации ServiceResponse из него
+            stored = _TaskFile.model_validate_json(task_file.read_bytes()).data
+        except (ValidationError, OSError):
             task_file.unlink(missing_ok=True)
             return None
 
+        if stored is None or (not stored.model_extra and "result" not in stored.model_fields_set):
+            return None
+        return {**(stored.model_extra or {}), "result": stored.result}
+
     def set_task(self, task_id: str, task_data: dict[str, Any]) -> None:
         """
         Store task result in cache.
@@ -176,33 +292,51 @@ class CacheService:
         """
         # Сохраняем в in-memory кеш
         self._task_cache[task_id] = task_data
+        self._persist_task(task_id, task_data)
+
+    async def aset_task(self, task_id: str, task_data: dict[str, Any]) -> None:
+        """
+        Store task result in cache without blocking the event loop on disk I/O.
+
+        In-memory кеш обновляется сразу, запись файла выполняется в потоке.
+
+        Args:
+            task_id: Task identifier
+            task_data: Task data to cache (может содержать ServiceResponse)
+        """
+        self._task_cache[task_id] = task_data
+        await asyncio.to_thread(self._persist_task, task_id, task_data)
 
-        # Сериализуем task_data для файлового кеша
-        # Если в task_data есть ServiceResponse, конвертируем в dict
-        serializable_data = task_data.copy()
-        if "result" in serializable_data:
-            result = serializable_data["result"]
-            if hasattr(result, "model_dump"):
-                # Если result - это Pydantic модель (ServiceResponse), сериализуем её
-                serializable_data["result"] = result.model_dump()
-            elif isinstance(result, dict):
-                # Если result уже dict, оставляем как есть
-                pass
+    def _persist_task(self, task_id: str, task_data: dict[str, Any]) -> None:
+        """
+        Write task data to the file cache shared between Gunicorn workers.
+
+        Args:
+            task_id: Task identifier
+            task_data: Task data to persist (может содержать ServiceResponse)
+        """
+        self._maybe_cleanup_task_files()
 
         # Сохраняем в файловый кеш для работы между Gunicorn workers
         task_file = self._task_cache_dir / f"{task_id}.json"
+        tmp_path: str | None = None
         try:
-            with open(task_file, "w", encoding="utf-8") as f:
-                json.dump(
-                    {"timestamp": time.time(), "data": serializable_data},
-                    f,
-                    ensure_ascii=False,
+            # Пишем во временный файл и атомарно подменяем: другой worker никогда
+            # не прочитает наполовину записанный JSON
+            fd, tmp_path = tempfile.mkstemp(dir=self._task_cache_dir, suffix=".tmp")
+            os.fchmod(fd, _TASK_FILE_MODE)
+            with os.fdopen(fd, "wb") as f:
+                # task_data сериализуем без копии: ServiceResponse встраивается через default.
+                # Сами мы берём время записи из mtime, но timestamp пишем ещё один релиз:
+                # воркеры на старом коде при rolling deploy считают файл без него просроченным
+                f.write(
+                    orjson.dumps({"timestamp": time.time(), "data": task_data}, default=_dump_model)
                 )
+            os.replace(tmp_path, task_file)
         except OSError as e:
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
             # Логируем ошибки записи файла, но не прерываем выполнение
-            import logging
-
-            logger = logging.getLogger(__name__)
             logger.warning(
                 "Failed to write task cache file",
                 extra={"task_id": task_id, "error": str(e), "path": str(task_file)},
@@ -221,19 +355,17 @@ class CacheService:
         Returns:
             Cache key string
         """
-        # Создаём строковое представление аргументов для хеширования
-        key_parts = [prefix]
-        if args:
-            key_parts.append(str(args))
-        if kwargs:
-            # Сортируем kwargs для консистентности
-            sorted_kwargs = sorted(kwargs.items())
-            key_parts.append(str(sorted_kwargs))
-
-        key_string = ":".join(key_parts)
-        # Хешируем для компактности и безопасности
-        key_hash = hashlib.md5(key_string.encode()).hexdigest()
-        return f"{prefix}:{key_hash}"
+        # Частый случай - один короткий строковый параметр (pid): хеш не нужен.
+        # (хеш-часть других ключей - 16 hex-символов, с именем параметра не совпадает)
+        if not args and len(kwargs) == 1:
+            ((name, value),) = kwargs.items()
+            if value is None:
+                return prefix + ":" + name
+            if type(value) is str and len(value) <= _MAX_RAW_KEY_VALUE_LENGTH:
+                return prefix + ":" + name + ":" + value
+
+        # Сортируем kwargs для консистентности
+        return _hash_cache_key(prefix, args, tuple(sorted(kwargs.items())))
 
     def clear_response_cache(self) -> None:
         """Clear all entries from response cache."""
@@ -244,6 +376,95 @@ class CacheService:
         self._task_cache.clear()
 
 
+def _dump_model(obj: Any) -> orjson.Fragment:
+    """Serialize Pydantic models met by orjson.dumps (e.g. ServiceResponse in task data)."""
+    if isinstance(obj, BaseModel):
+        # JSON модели вставляется как есть - без промежуточного dict из model_dump()
+        return orjson.Fragment(obj.model_dump_json())
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class _StoredTaskData(BaseModel):
+    """Task data as stored in the file cache; keys other than result are kept as is."""
+
+    model_config = ConfigDict(extra="allow")
+
+    # Сначала пробуем ServiceResponse, иначе оставляем значение как есть
+    result: ServiceResponse | Any = Field(default=None, union_mode="left_to_right")
+
+
+class _TaskFile(BaseModel):
+    """Envelope of a task cache file; its timestamp field is written but not read."""
+
+    data: _StoredTaskData | None = None
+
+
+class _ResponseLFUCache(LFUCache):
+    """LFUCache of (value, expires_at) entries that can drop expired ones cheaply."""
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(maxsize=maxsize)
+        # Сроки записей в порядке записи: TTL общий, поэтому это и порядок истечения.
+        # Удаление (в том числе вытеснение LFU) убирает ключ и отсюда - размер не больше maxsize
+        self._expires_at: OrderedDict[str, float] = OrderedDict()
+
+    def __setitem__(self, key: str, entry: tuple[Any, float]) -> None:
+        super().__setitem__(key, entry)
+        self._expires_at[key] = entry[1]
+        # Перезаписанный ключ переносим в конец - порядок истечения сохраняется
+        self._expires_at.move_to_end(key)
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        self._expires_at.pop(key, None)
+
+    def clear(self) -> None:
+        super().clear()
+        self._expires_at.clear()
+
+    def expire(self, now: float) -> None:
+        """Remove entries expired by now without touching LFU use counts."""
+        expires_at = self._expires_at
+        while expires_at:
+            key, deadline = next(iter(expires_at.items()))
+            if deadline > now:
+                break
+            del self[key]
+
+
+class _TaskTTLCache(TTLCache):
+    """TTLCache that loads missing entries with the given loader and keeps them."""
+
+    def __init__(self, loader: Callable[[str], Any | None], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._loader = loader
+
+    def __missing__(self, key: str) -> Any:
+        value = self._loader(key)
+        if value is None:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
+
+def _hash_cache_key(
+    prefix: str, args: tuple[Any, ...], kw_items: tuple[tuple[str, Any], ...]
+) -> str:
+    """Hash cache key parts without building an intermediate string."""
+    # Передаём части ключа в хешер по одной, не собирая промежуточную строку;
+    # нулевой байт разделяет части, чтобы соседние значения не склеивались
+    hasher = hashlib.blake2b(prefix.encode("utf-8"), digest_size=8)
+    for arg in args:
+        hasher.update(b"\x00")
+        hasher.update(repr(arg).encode("utf-8"))
+    for name, value in kw_items:
+        hasher.update(b"\x00")
+        hasher.update(name.encode("utf-8"))
+        hasher.update(b"=")
+        hasher.update(repr(value).encode("utf-8"))
+    return prefix + ":" + hasher.hexdigest()
+
+
 def cached_response(
     cache_service: CacheService,
     key_prefix: str = "flights",
@@ -264,16 +485,10 @@ def cached_response(
             # Строим ключ кеша из аргументов функции
             cache_key = CacheService.build_cache_key(key_prefix, *args, **kwargs)
 
-            # Пытаемся получить из кеша
-            cached_result = cache_service.get_response(cache_key)
-            if cached_result is not None:
-                return cached_result
-
-            # Выполняем функцию и кешируем результат
-            result = await func(*args, **kwargs)
-            cache_service.set_response(cache_key, result)
-
-            return result
+            # Берём из кеша или выполняем функцию один раз на все конкурентные вызовы
+            return await cache_service.get_or_set_response(
+                cache_key, lambda: func(*args, **kwargs)
+            )
 
         return wrapper
 
@@ -48,8 +48,9 @@ class ProcessIdFilter(logging.Filter):
     """Ensure `pid` key is always available in log records."""
 
     def filter(self, record: logging.LogRecord) -> bool:
-        if not hasattr(record, "pid"):
-            record.pid = "-"
+        # pid здесь - идентификатор поиска из extra, а не PID процесса (он есть в
+        # record.process), поэтому только подставляем значение по умолчанию
+        record.__dict__.setdefault("pid", "-")
         return True
 
 
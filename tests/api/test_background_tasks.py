@@ -9,9 +9,10 @@ import pytest
 from fastapi.testclient import TestClient
 
 from av_parser.models import ServiceResponse
-from fly_search.api.dependencies import get_cache_service, get_flight_service
+from fly_search.api.dependencies import get_cache_service
 from fly_search.app import create_app
-from fly_search.domain.services.background_task import TaskStatus
+from fly_search.domain.services.background_task import BackgroundTaskService, TaskStatus
+from fly_search.infrastructure.background_task_manager import BackgroundTaskManager
 
 
 @pytest.fixture
@@ -21,6 +22,7 @@ def app():
     app.dependency_overrides.clear()
     # Очищаем кеш задач после теста
     cache_service = get_cache_service()
+    cache_service.clear_response_cache()
     cache_service.clear_task_cache()
 
 
@@ -40,7 +42,11 @@ def override_service_with_response(app, response: ServiceResponse) -> None:
                 result=response.result,
             )
 
-    app.dependency_overrides[get_flight_service] = lambda: _Service()
+    # Task routes take the manager from app.state, so replace it there
+    app.state.task_manager = BackgroundTaskManager(
+        task_service=BackgroundTaskService(flight_search_service=_Service()),
+        cache_service=get_cache_service(),
+    )
 
 
 @pytest.mark.asyncio
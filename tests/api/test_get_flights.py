@@ -6,7 +6,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from av_parser.models import ServiceResponse
-from fly_search.api.dependencies import get_flight_service
+from fly_search.api.dependencies import get_cache_service, get_flight_service
 from fly_search.app import create_app
 
 
@@ -15,7 +15,10 @@ def app():
     app = create_app()
     yield app
     app.dependency_overrides.clear()
-
+    # Кеш - синглтон на всю сессию, поэтому очищаем его, а не создаём заново
+    cache = get_cache_service()
+    cache.clear_response_cache()
+    cache.clear_task_cache()
 
 
 @pytest.fixture
@@ -18,6 +18,7 @@ def app():
     # Очищаем кеш после теста
     cache = get_cache_service()
     cache.clear_response_cache()
+    cache.clear_task_cache()
 
 
 @pytest.fixture
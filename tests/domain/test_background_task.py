@@ -0,0 +1,23 @@
+"""Tests for BackgroundTaskService."""
+
+from __future__ import annotations
+
+from uuid import RFC_4122, UUID
+
+import pytest
+
+from fly_search.domain.services.background_task import BackgroundTaskService
+
+
+@pytest.mark.asyncio
+async def test_start_task_returns_uuid7() -> None:
+    service = BackgroundTaskService(flight_search_service=None)  # type: ignore[arg-type]
+
+    task_ids = [await service.start_task(pid="test") for _ in range(1000)]
+
+    parsed = [UUID(task_id) for task_id in task_ids]
+    assert all(uuid.version == 7 and uuid.variant == RFC_4122 for uuid in parsed)
+    assert len(set(task_ids)) == len(task_ids)
+    # Старшие 48 бит - время в миллисекундах, поэтому идентификаторы не убывают
+    timestamps = [uuid.int >> 80 for uuid in parsed]
+    assert timestamps == sorted(timestamps)
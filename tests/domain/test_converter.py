@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import pickle
+
+import pytest
+
 from av_parser.models import FlightOffer
 from fly_search.domain.services.converter import FlightOfferConverter
 
 
-def test_converter_produces_offer(chunk_builder) -> None:
+def test_converter_produces_offer(chunk_builder, converter: FlightOfferConverter) -> None:
     chunk = chunk_builder()
-    converter = FlightOfferConverter()
 
     result = converter.convert_chunk(chunk)
 
@@ -23,8 +26,10 @@ def test_converter_produces_offer(chunk_builder) -> None:
     assert offer.is_vtrip is False
 
 
-def test_converter_detects_vtrip(chunk_builder) -> None:
-    chunk = chunk_builder()
+@pytest.fixture(scope="module")
+def vtrip_chunk_blob(chunk_blob: bytes) -> bytes:
+    """Pickle the sample chunk patched into a vtrip once per module."""
+    chunk = pickle.loads(chunk_blob)
     # add second leg with different operating carrier
     chunk["flight_legs"].append(
         {
@@ -42,9 +47,12 @@ def test_converter_detects_vtrip(chunk_builder) -> None:
         "trip_class": "Y",
         "marketing_carrier_designator": {"carrier": "R0", "number": "123"},
     }
-    converter = FlightOfferConverter()
+    return pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def test_converter_detects_vtrip(vtrip_chunk_blob: bytes, converter: FlightOfferConverter) -> None:
+    chunk = pickle.loads(vtrip_chunk_blob)
 
     offers = converter.convert_chunk(chunk)["MOWLED20251217"]
 
     assert offers[0].is_vtrip is True
-
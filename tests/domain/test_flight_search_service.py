@@ -2,8 +2,8 @@
 
 from __future__ import annotations
 
-import asyncio
-from collections.abc import AsyncIterator
+import logging
+from collections.abc import AsyncIterator, Iterator
 from dataclasses import dataclass
 from typing import Any
 
@@ -12,6 +12,9 @@ import pytest
 from fly_search.domain.services.converter import FlightOfferConverter
 from fly_search.domain.services.flight_search import FlightSearchService
 
+# Один event loop на весь модуль вместо нового на каждый тест
+pytestmark = pytest.mark.asyncio(scope="module")
+
 
 @dataclass
 class FakeAviaApi:
@@ -21,76 +24,119 @@ class FakeAviaApi:
     chunks: list[dict[str, Any]]
 
     async def start_search(self) -> dict[str, Any]:
-        await asyncio.sleep(0)
         return self.start_payload
 
     async def get_chunk(self, task_id: str) -> AsyncIterator[dict[str, Any]]:
         for chunk in self.chunks:
-            await asyncio.sleep(0)
             yield chunk
 
 
-@pytest.mark.asyncio
-async def test_service_returns_success(chunk_builder) -> None:
-    api = FakeAviaApi(
-        start_payload={"success": True, "task_id": "task"},
-        chunks=[chunk_builder()],
-    )
-    service = FlightSearchService(api, converter=FlightOfferConverter())
+class FailingConverter(FlightOfferConverter):
+    """Converter that always fails to check error handling."""
 
-    response = await service.get_offers(pid="test")
+    def convert_chunk(self, chunk: dict[str, Any]):
+        raise RuntimeError("Forced failure")
 
-    assert response.success is True
-    assert response.pid == "test"
-    assert "MOWLED20251217" in response.result
 
+_FAILING_CONVERTER = FailingConverter()
 
-@pytest.mark.asyncio
-async def test_empty_chunk_returns_empty_response(chunk_builder) -> None:
-    api = FakeAviaApi(
-        start_payload={"success": True, "task_id": "task"},
-        chunks=[{}],
-    )
-    service = FlightSearchService(api)
 
-    response = await service.get_offers(pid="test")
+class _ListHandler(logging.Handler):
+    """Collect formatted messages of emitted records."""
 
-    assert response.success is False
-    assert response.result == {}
-    assert response.pid == "test"
+    def __init__(self) -> None:
+        super().__init__(level=logging.ERROR)
+        self.messages: list[str] = []
 
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
 
-@pytest.mark.asyncio
-async def test_missing_task_id_returns_failure(chunk_builder, caplog) -> None:
+
+@pytest.fixture
+def error_messages() -> Iterator[list[str]]:
+    """Capture ERROR messages of fly_search loggers without touching logger levels."""
+    handler = _ListHandler()
+    logger = logging.getLogger("fly_search")
+    logger.addHandler(handler)
+    yield handler.messages
+    logger.removeHandler(handler)
+
+
+async def test_service_returns_success(chunk_builder, converter: FlightOfferConverter) -> None:
     api = FakeAviaApi(
-        start_payload={"success": True},
+        start_payload={"success": True, "task_id": "task"},
         chunks=[chunk_builder()],
     )
-    service = FlightSearchService(api)
+    service = FlightSearchService(api, converter=converter)
 
-    with caplog.at_level("ERROR"):
-        response = await service.get_offers(pid="test")
+    response = await service.get_offers(pid="test")
 
-    assert response.success is False
-    assert response.result == {}
-    assert "missing task_id" in caplog.text
+    assert response.success is True
+    assert response.pid == "test"
+    assert "MOWLED20251217" in response.result
 
 
-@pytest.mark.asyncio
-async def test_converter_exception_is_logged(chunk_builder, caplog) -> None:
-    class FailingConverter(FlightOfferConverter):
-        def convert_chunk(self, chunk: dict[str, Any]):
-            raise RuntimeError("Forced failure")
+async def test_top_k_keeps_cheapest_offers_per_route(chunk_builder) -> None:
+    chunks = []
+    for price in (300, 100, 200, 100):
+        chunk = chunk_builder()
+        chunk["tickets"][0]["proposals"][0]["price"]["value"] = price
+        chunk["tickets"][0]["signature"] = f"SIG-{len(chunks)}"
+        chunks.append(chunk)
+    api = FakeAviaApi(start_payload={"success": True, "task_id": "task"}, chunks=chunks)
+    service = FlightSearchService(api)
 
+    response = await service.get_offers(pid="test", top_k=2)
+
+    offers = response.result["MOWLED20251217"]
+    assert [(offer.min_price, offer.key) for offer in offers] == [(100, "SIG-1"), (100, "SIG-3")]
+
+
+@pytest.mark.parametrize(
+    ("start_payload", "with_chunk", "failing_converter", "expected_log"),
+    [
+        pytest.param(
+            {"success": True, "task_id": "task"},
+            False,
+            None,
+            None,
+            id="empty_chunk",
+        ),
+        pytest.param(
+            {"success": True},
+            True,
+            None,
+            "missing task_id",
+            id="missing_task_id",
+        ),
+        pytest.param(
+            {"success": True, "task_id": "task"},
+            True,
+            _FAILING_CONVERTER,
+            "unexpected error converting chunk",
+            id="converter_exception",
+        ),
+    ],
+)
+async def test_get_offers_returns_empty_failure(
+    chunk_builder,
+    converter: FlightOfferConverter,
+    error_messages: list[str],
+    start_payload: dict[str, Any],
+    with_chunk: bool,
+    failing_converter: FlightOfferConverter | None,
+    expected_log: str | None,
+) -> None:
     api = FakeAviaApi(
-        start_payload={"success": True, "task_id": "task"},
-        chunks=[chunk_builder()],
+        start_payload=start_payload,
+        chunks=[chunk_builder() if with_chunk else {}],
     )
-    service = FlightSearchService(api, converter=FailingConverter())
+    service = FlightSearchService(api, converter=failing_converter or converter)
 
-    with caplog.at_level("ERROR"):
-        response = await service.get_offers(pid="test")
+    response = await service.get_offers(pid="test")
 
     assert response.success is False
     assert response.result == {}
-    assert "unexpected error converting chunk" in caplog.text
+    assert response.pid == "test"
+    if expected_log is not None:
+        assert any(expected_log in message for message in error_messages)
@@ -0,0 +1,199 @@
+"""Tests for AviaApiAdapter chunk streaming."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import Any
+
+import pytest
+
+from fly_search.infrastructure.avia_api_adapter import AviaApiAdapter
+
+CHUNK_QUEUE_SIZE = 2
+
+
+class FakeAviaApi:
+    """Provider fake that yields chunks without sleeping and records its progress."""
+
+    def __init__(
+        self,
+        chunks: list[dict[str, Any]],
+        error: Exception | None = None,
+        finish_delay: float = 0,
+    ) -> None:
+        self.chunks = chunks
+        self.error = error
+        self.finish_delay = finish_delay
+        self.produced = 0
+        # События из потока генератора: (task_id, "start" | "finish")
+        self.events: list[tuple[str, str]] = []
+        self.finished = threading.Event()
+
+    async def start_search(self) -> dict[str, Any]:
+        return {"success": True, "task_id": "task"}
+
+    async def get_chunk(self, task_id: str) -> AsyncIterator[dict[str, Any]]:
+        self.events.append((task_id, "start"))
+        try:
+            for chunk in self.chunks:
+                self.produced += 1
+                yield chunk
+            if self.error is not None:
+                raise self.error
+        finally:
+            # Блокирующий сон, как у провайдера: поток ещё работает после ухода потребителя
+            time.sleep(self.finish_delay)  # noqa: ASYNC251
+            self.events.append((task_id, "finish"))
+            self.finished.set()
+
+
+def make_adapter(api: FakeAviaApi, futures: list[Future[None]], **kwargs: Any) -> AviaApiAdapter:
+    """Build an adapter that records futures of its generator threads."""
+    kwargs.setdefault("thread_join_timeout", 5)
+    adapter = AviaApiAdapter(avia_api=api, chunk_queue_size=CHUNK_QUEUE_SIZE, **kwargs)
+    submit = adapter._executor.submit
+
+    def recording_submit(fn: Any, /, *args: Any, **kw: Any) -> Future[None]:
+        future = submit(fn, *args, **kw)
+        futures.append(future)
+        return future
+
+    adapter._executor.submit = recording_submit  # type: ignore[method-assign]
+    return adapter
+
+
+async def test_get_chunk_yields_chunks_in_order_skipping_empty() -> None:
+    """Test that chunks arrive in provider order and empty chunks are dropped."""
+    api = FakeAviaApi([{"i": 0}, {}, {"i": 1}, {}, {"i": 2}])
+    futures: list[Future[None]] = []
+    adapter = make_adapter(api, futures)
+
+    chunks = [chunk async for chunk in adapter.get_chunk("task")]
+
+    assert chunks == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert len(futures) == 1 and futures[0].done()
+
+
+async def test_get_chunk_bounds_undelivered_chunks() -> None:
+    """Test that the thread buffers at most chunk_queue_size undelivered chunks."""
+    api = FakeAviaApi([{"i": i} for i in range(50)])
+    adapter = make_adapter(api, [])
+    gen = adapter.get_chunk("task")
+
+    assert await gen.__anext__() == {"i": 0}
+    # Даём потоку время заполнить буфер: он должен встать, а не дочитать провайдера
+    await asyncio.sleep(0.2)
+
+    # Отдан один чанк, в буфере CHUNK_QUEUE_SIZE, ещё один поток держит в ожидании слота
+    assert api.produced == 1 + CHUNK_QUEUE_SIZE + 1
+
+    rest = [chunk async for chunk in gen]
+    assert [chunk["i"] for chunk in rest] == list(range(1, 50))
+
+
+@pytest.mark.parametrize("stop", ["break", "aclose"])
+async def test_get_chunk_stops_thread_when_consumer_leaves(stop: str) -> None:
+    """Test that an early break or aclose stops the generator thread."""
+    api = FakeAviaApi([{"i": i} for i in range(50)])
+    futures: list[Future[None]] = []
+    adapter = make_adapter(api, futures)
+
+    if stop == "break":
+        async with aclosing(adapter.get_chunk("task")) as gen:
+            async for _ in gen:
+                break
+    else:
+        gen = adapter.get_chunk("task")
+        await gen.__anext__()
+        await gen.aclose()
+
+    assert futures[0].done()
+    assert api.finished.is_set()
+    assert api.produced < 50
+
+
+async def test_get_chunk_propagates_generator_exception() -> None:
+    """Test that a provider exception reaches the consumer after earlier chunks."""
+    api = FakeAviaApi([{"i": 0}], error=ValueError("provider failed"))
+    adapter = make_adapter(api, [])
+    received: list[dict[str, Any]] = []
+
+    with pytest.raises(ValueError, match="provider failed"):
+        async for chunk in adapter.get_chunk("task"):
+            received.append(chunk)
+
+    assert received == [{"i": 0}]
+
+
+def test_get_chunk_stops_thread_when_loop_closes_without_aclose() -> None:
+    """Test that the thread stops once the consumer loop is closed under a full buffer."""
+    api = FakeAviaApi([{"i": i} for i in range(50)])
+    futures: list[Future[None]] = []
+    adapter = make_adapter(api, futures)
+    loop = asyncio.new_event_loop()
+    gen = adapter.get_chunk("task")
+
+    assert loop.run_until_complete(anext(gen)) == {"i": 0}
+    # Закрываем loop, не финализируя генератор: stopped никто не выставит
+    loop.close()
+
+    assert api.finished.wait(5)
+    assert futures[0].result(timeout=5) is None
+    assert api.produced < 50
+
+    # Закрываем генератор в отдельном loop, чтобы его не финализировал закрытый
+    cleanup_loop = asyncio.new_event_loop()
+    try:
+        cleanup_loop.run_until_complete(gen.aclose())
+    finally:
+        cleanup_loop.close()
+
+
+async def test_get_chunk_waits_for_thread_slot() -> None:
+    """Test that with max_threads=1 a second search starts after the first thread ends."""
+    # Поток первого поиска переживает таймаут ожидания в finally
+    api = FakeAviaApi([{"i": i} for i in range(50)], finish_delay=0.2)
+    adapter = make_adapter(api, [], max_threads=1, thread_join_timeout=0.01)
+
+    first = adapter.get_chunk("first")
+    await first.__anext__()
+
+    second = adapter.get_chunk("second")
+    second_chunk = asyncio.create_task(anext(second))
+    await asyncio.sleep(0.1)
+    # Второй поиск ждёт слот и свой генератор не запускал
+    assert api.events == [("first", "start")]
+    assert not second_chunk.done()
+
+    await first.aclose()
+    assert await second_chunk == {"i": 0}
+    await second.aclose()
+
+    # Генератор второго поиска стартовал только после завершения потока первого
+    assert api.events[:3] == [("first", "start"), ("first", "finish"), ("second", "start")]
+
+
+async def test_get_chunk_returns_slot_after_early_break() -> None:
+    """Test that the loop semaphore slot comes back once an abandoned thread ends."""
+    api = FakeAviaApi([{"i": i} for i in range(50)], finish_delay=0.2)
+    futures: list[Future[None]] = []
+    adapter = make_adapter(api, futures, max_threads=1, thread_join_timeout=0.01)
+    semaphore = adapter._get_semaphore(asyncio.get_running_loop())
+
+    async with aclosing(adapter.get_chunk("task")) as gen:
+        async for _ in gen:
+            break
+
+    # Поток ещё работает - слот занят, хотя ожидание в finally уже вышло по таймауту
+    assert not futures[0].done()
+    assert semaphore.locked()
+
+    # Слот возвращается из done-callback потока, не утекает
+    await asyncio.wait_for(semaphore.acquire(), timeout=5)
+    assert futures[0].done()
+    semaphore.release()
@@ -2,16 +2,45 @@
 
 from __future__ import annotations
 
+import asyncio
+import os
+import stat
 import time
+from collections.abc import Iterator
+
+import pytest
 
 from av_parser.models import ServiceResponse
+from fly_search.infrastructure import cache_service as cache_service_module
 from fly_search.infrastructure.cache_service import CacheService
 
 
-def test_cache_service_stores_and_retrieves_response() -> None:
+@pytest.fixture(scope="module")
+def cache(tmp_path_factory: pytest.TempPathFactory) -> Iterator[CacheService]:
+    """Share one CacheService between tests of the module; tests namespace their keys."""
+    # Отдельный каталог файлового кеша, чтобы задачи прошлых запусков не мешали
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("FLY_SEARCH_TASK_CACHE_DIR", str(tmp_path_factory.mktemp("task_cache")))
+        service = CacheService(
+            response_cache_ttl=60,
+            response_cache_size=100,
+            task_cache_ttl=60,
+            task_cache_size=100,
+        )
+    yield service
+    service.clear_response_cache()
+    service.clear_task_cache()
+
+
+@pytest.fixture
+def ns(request: pytest.FixtureRequest) -> str:
+    """Return a per-test key namespace for the shared cache."""
+    return request.node.name
+
+
+def test_cache_service_stores_and_retrieves_response(cache: CacheService, ns: str) -> None:
     """Test that cache service can store and retrieve responses."""
-    cache = CacheService(response_cache_ttl=60, response_cache_size=10)
-    test_key = "test_key"
+    test_key = f"{ns}:key"
     test_value = ServiceResponse(success=True, pid="test", result={})
 
     # Кеш пуст
@@ -27,8 +56,12 @@ def test_cache_service_stores_and_retrieves_response() -> None:
     assert cached.pid == test_value.pid
 
 
-def test_cache_service_ttl_expiration() -> None:
+def test_cache_service_ttl_expiration(monkeypatch) -> None:
     """Test that cache entries expire after TTL."""
+    # Подменяем часы кеша, чтобы не ждать истечения TTL в реальном времени
+    now = [1000.0]
+    monkeypatch.setattr(cache_service_module, "_monotonic", lambda: now[0])
+
     cache = CacheService(response_cache_ttl=1, response_cache_size=10)  # 1 секунда
     test_key = "test_key"
     test_value = ServiceResponse(success=True, pid="test", result={})
@@ -39,33 +72,107 @@ def test_cache_service_ttl_expiration() -> None:
     # Сразу получаем - должно быть в кеше
     assert cache.get_response(test_key) is not None
 
-    # Ждём истечения TTL
-    time.sleep(1.1)
+    # Сдвигаем часы за TTL
+    now[0] += 2
 
     # После истечения TTL - должно быть None
     assert cache.get_response(test_key) is None
 
 
-def test_cache_service_build_cache_key() -> None:
-    """Test cache key building."""
-    key1 = CacheService.build_cache_key("flights", pid="test-123")
-    key2 = CacheService.build_cache_key("flights", pid="test-123")
-    key3 = CacheService.build_cache_key("flights", pid="test-456")
+def test_cache_service_expired_popular_response_is_evicted(monkeypatch) -> None:
+    """Test that expired entries give up their LFU slots before fresh ones are evicted."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_service_module, "_monotonic", lambda: now[0])
 
-    # Одинаковые параметры дают одинаковый ключ
-    assert key1 == key2
+    cache = CacheService(response_cache_ttl=10, response_cache_size=2)
+    cache.set_response("hot", "value")
+    for _ in range(5):
+        assert cache.get_response("hot") == "value"
 
-    # Разные параметры дают разные ключи
-    assert key1 != key3
+    # Популярный ключ истёк: при вставке уходит он, а не свежая запись
+    now[0] += 11
+    cache.set_response("a", "value")
+    cache.set_response("b", "value")
+    assert cache.get_response("a") == "value"
+    assert cache.get_response("b") == "value"
 
-    # Ключ начинается с префикса
-    assert key1.startswith("flights:")
+    # Перезаписи не копят сроки: учёт истечения не больше размера кеша
+    for i in range(50):
+        now[0] += 0.01
+        cache.set_response("a", i)
+    assert len(cache._response_cache._expires_at) <= 2
 
 
-def test_cache_service_task_storage() -> None:
+def test_cache_service_build_cache_key() -> None:
+    """Test cache key building."""
+    key = CacheService.build_cache_key("flights", pid="test-123")
+
+    # Одинаковые параметры дают одинаковый ключ, разные - разные
+    assert CacheService.build_cache_key("flights", pid="test-123") == key
+    assert CacheService.build_cache_key("flights", pid="test-456") != key
+
+    # Короткий pid входит в ключ как есть, остальное хешируется blake2b(digest_size=8)
+    assert key == "flights:pid:test-123"
+    hashed_key = CacheService.build_cache_key("flights", "test-123", limit=10)
+    prefix, digest = hashed_key.split(":")
+    assert prefix == "flights"
+    assert len(digest) == 16
+    int(digest, 16)
+
+    # Равные как ключи словаря значения разных типов не делят закешированный хеш
+    assert CacheService.build_cache_key("flights", limit=1) != CacheService.build_cache_key(
+        "flights", limit=True
+    )
+
+
+async def test_cache_service_coalesces_concurrent_misses(cache: CacheService, ns: str) -> None:
+    """Test that concurrent misses for one key compute the value once."""
+    key = f"{ns}:key"
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(
+        *(cache.get_or_set_response(key, compute) for _ in range(5))
+    )
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.get_response(key) == "value"
+
+
+async def test_cache_service_waiter_survives_owner_cancellation(
+    cache: CacheService, ns: str
+) -> None:
+    """Test that cancelling the computing request does not fail its waiters."""
+    key = f"{ns}:key"
+    calls = 0
+
+    async def compute() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    owner = asyncio.create_task(cache.get_or_set_response(key, compute))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_set_response(key, compute))
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    # Ожидающий сам пересчитывает значение вместо чужого CancelledError
+    assert await waiter == "value"
+    assert owner.cancelled()
+    assert calls == 2
+
+
+def test_cache_service_task_storage(cache: CacheService, ns: str) -> None:
     """Test that cache service can store and retrieve tasks."""
-    cache = CacheService(task_cache_ttl=60, task_cache_size=10)
-    task_id = "task-123"
+    task_id = f"{ns}-task-123"
     task_data = {"status": "completed", "result": {"success": True}}
 
     # Кеш пуст
@@ -81,22 +188,44 @@ def test_cache_service_task_storage() -> None:
     assert cached["result"]["success"] is True
 
 
-def test_cache_service_clear_methods() -> None:
+def test_cache_service_task_files_permissions_and_stale_tmp(cache: CacheService, ns: str) -> None:
+    """Test that task files get open()-like permissions and stale temp files are swept."""
+    task_id = f"{ns}-task"
+    cache.set_task(task_id, {"status": "completed"})
+
+    task_file = cache._task_cache_dir / f"{task_id}.json"
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(task_file.stat().st_mode) == 0o666 & ~umask
+
+    # Временный файл упавшей записи старше TTL удаляется вместе с просроченными задачами
+    stale_tmp = cache._task_cache_dir / f"{ns}.tmp"
+    stale_tmp.write_bytes(b"{")
+    expired = time.time() - 120
+    os.utime(stale_tmp, (expired, expired))
+
+    cache._cleanup_old_task_files()
+
+    assert not stale_tmp.exists()
+    assert task_file.exists()
+
+
+def test_cache_service_clear_methods(cache: CacheService, ns: str) -> None:
     """Test cache clearing methods."""
-    cache = CacheService(response_cache_ttl=60, response_cache_size=10)
+    key1, key2 = f"{ns}:key1", f"{ns}:key2"
 
     # Добавляем значения
-    cache.set_response("key1", "value1")
-    cache.set_response("key2", "value2")
+    cache.set_response(key1, "value1")
+    cache.set_response(key2, "value2")
 
     # Проверяем, что они есть
-    assert cache.get_response("key1") is not None
-    assert cache.get_response("key2") is not None
+    assert cache.get_response(key1) is not None
+    assert cache.get_response(key2) is not None
 
     # Очищаем кеш
     cache.clear_response_cache()
 
     # После очистки должно быть пусто
-    assert cache.get_response("key1") is None
-    assert cache.get_response("key2") is None
+    assert cache.get_response(key1) is None
+    assert cache.get_response(key2) is None
 